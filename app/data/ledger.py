@@ -6,10 +6,29 @@ DB_PATH = Path("data/sales.db")
 DB_PATH.parent.mkdir(exist_ok=True)
 
 TABLE_NAME = "sales_ledger"
+LEDGER_COLUMNS = ["date", "account", "ASIN", "sales", "net_sales"]
 
 
 def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    # Autocommit mode; writers open their own BEGIN so a save is one fsync
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+def _has_unique_key(conn):
+    # Either the table's UNIQUE constraint (sqlite_autoindex_*) or a migrated index
+    for _, name, unique, *_ in conn.execute(f"PRAGMA index_list({TABLE_NAME})"):
+        if not unique:
+            continue
+        cols = [c[2] for c in conn.execute(f"PRAGMA index_info({name})")]
+        if cols == ["date", "account", "ASIN"]:
+            return True
+    return False
 
 
 def init_db():
@@ -21,21 +40,56 @@ def init_db():
                 account TEXT,
                 ASIN TEXT,
                 sales REAL,
-                net_sales REAL
+                net_sales REAL,
+                UNIQUE(date, account, ASIN)
             )
             """
         )
+        # Tables created before the UNIQUE constraint still need it for ON CONFLICT.
+        # The old delete-and-append save could leave duplicate keys; keep the
+        # newest row of each so the index can be built (one-time migration).
+        if not _has_unique_key(conn):
+            conn.execute("BEGIN")
+            conn.execute(
+                f"""
+                DELETE FROM {TABLE_NAME}
+                WHERE rowid NOT IN (
+                    SELECT MAX(rowid) FROM {TABLE_NAME} GROUP BY date, account, ASIN
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_{TABLE_NAME}_key
+                ON {TABLE_NAME} (date, account, ASIN)
+                """
+            )
+            conn.execute("COMMIT")
+        # The (date, account, ASIN) key already serves date range scans via its prefix
+        conn.execute(f"DROP INDEX IF EXISTS idx_{TABLE_NAME}_date")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_account ON {TABLE_NAME} (account)"
+        )
 
 
-def load_ledger() -> pd.DataFrame:
+def load_ledger(f=None, t=None) -> pd.DataFrame:
     init_db()
+    sql = f"SELECT * FROM {TABLE_NAME}"
+    params = ()
+
+    # Dates are stored as ISO text, so BETWEEN on the strings is a range scan
+    if f is not None and t is not None:
+        sql += " WHERE date BETWEEN ? AND ?"
+        params = (
+            pd.Timestamp(f).strftime("%Y-%m-%d"),
+            pd.Timestamp(t).strftime("%Y-%m-%d"),
+        )
+
     with get_conn() as conn:
-        df = pd.read_sql(f"SELECT * FROM {TABLE_NAME}", conn)
+        df = pd.read_sql(sql, conn, params=params)
 
     if df.empty:
-        return pd.DataFrame(
-            columns=["date", "account", "ASIN", "sales", "net_sales"]
-        )
+        return pd.DataFrame(columns=LEDGER_COLUMNS)
 
     df["date"] = pd.to_datetime(df["date"])
     return df
@@ -43,14 +97,29 @@ def load_ledger() -> pd.DataFrame:
 
 def save_ledger(df: pd.DataFrame):
     init_db()
+    if df.empty:
+        return
+
+    # Zip the columns straight into the parameter stream: no frame copy
+    params = zip(
+        pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d").tolist(),
+        df["account"].tolist(),
+        df["ASIN"].tolist(),
+        df["sales"].tolist(),
+        df["net_sales"].tolist(),
+    )
+
+    # 🔒 Upsert only the touched rows, all in one transaction
     with get_conn() as conn:
-        # 🔒 Replace whole table (safe & simple for your use case)
-        conn.execute(f"DELETE FROM {TABLE_NAME}")
-        df.copy().assign(
-            date=lambda x: x["date"].astype(str)
-        ).to_sql(
-            TABLE_NAME,
-            conn,
-            if_exists="append",
-            index=False,
+        conn.execute("BEGIN")
+        conn.executemany(
+            f"""
+            INSERT INTO {TABLE_NAME} (date, account, ASIN, sales, net_sales)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (date, account, ASIN)
+            DO UPDATE SET
+                sales = excluded.sales,
+                net_sales = excluded.net_sales
+            """,
+            params,
         )
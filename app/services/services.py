@@ -1,6 +1,9 @@
 import pandas as pd
 import os
+import re
 import warnings
+from functools import lru_cache
+from pandas.api.types import is_numeric_dtype
 
 # =========================
 # CONSTANTS
@@ -12,21 +15,29 @@ PER_DAY_TARGET = MONTHLY_TARGET / WORKING_DAYS
 
 PLANNING_FOLDER = os.path.join("data", "planning")
 
+# Rust-based calamine parses xlsx far faster than openpyxl; optional, and
+# read_excel only knows engine="calamine" from pandas 2.2
+try:
+    import python_calamine  # noqa: F401
+    _PANDAS_VERSION = tuple(int(p) for p in pd.__version__.split(".")[:2])
+    EXCEL_ENGINE = "calamine" if _PANDAS_VERSION >= (2, 2) else "openpyxl"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# Only these (normalized) columns of a sales report are used by build_rows
+_NEEDED_COLS = {"asin", "parentasin", "orderedproductsales", "orderedrevenue"}
+
 # =========================
 # COMMON HELPERS
 # =========================
+_NORM_RE = re.compile(r"[\ufeff()\-_ ]")
+
 def norm(c):
-    return (
-        str(c)
-        .lower()
-        .replace("\ufeff", "")
-        .replace("(", "")
-        .replace(")", "")
-        .replace("-", "")
-        .replace("_", "")
-        .replace(" ", "")
-        .strip()
-    )
+    lo = str(c).lower()
+    # Already-clean names (e.g. "asin", "orderedproductsales") need no rewrite
+    if lo.isascii() and lo.isalnum():
+        return lo
+    return _NORM_RE.sub("", lo).strip()
 
 def clean_money(x):
     if pd.isna(x):
@@ -39,6 +50,24 @@ def clean_money(x):
         .strip()
     )
 
+def clean_money_series(s):
+    # Vectorized clean_money for whole columns
+    if is_numeric_dtype(s):
+        # e.g. Vendor Central revenue already parsed as numbers
+        return s.astype(float).fillna(0.0)
+
+    cleaned = s.astype(str).str.replace(r"[₹,]|INR", "", regex=True).str.strip()
+    blank = s.isna() | (cleaned == "")
+    out = pd.to_numeric(cleaned.mask(blank, "0"), errors="coerce")
+
+    # Like clean_money, reject the upload instead of saving junk amounts as 0
+    bad = out.isna() & ~blank
+    if bad.any():
+        samples = s[bad].astype(str).unique()[:5].tolist()
+        print("CLEAN_MONEY_ERROR:", int(bad.sum()), "unparseable amounts, e.g.", samples)
+        raise ValueError(f"Unparseable amounts in {s.name!r}: {samples}")
+    return out.astype(float)
+
 def empty_df():
     return pd.DataFrame()
 
@@ -57,54 +86,69 @@ def get_planning_file_for_date(d):
 # =========================
 # FILE LOADER
 # =========================
-def load_file(source, sheet_name=0, skiprows=0):
+def _read_excel(source, **kwargs):
+    if EXCEL_ENGINE != "openpyxl":
+        return pd.read_excel(source, engine=EXCEL_ENGINE, **kwargs)
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings(
+            "ignore",
+            category=UserWarning,
+            module="openpyxl",
+        )
+        return pd.read_excel(source, engine="openpyxl", **kwargs)
+
+def load_file(source, sheet_name=0, skiprows=0, usecols=None):
     try:
         if hasattr(source, "filename"):
             source.file.seek(0)
             name = source.filename.lower()
 
             if name.endswith(".csv") or name.endswith(".txt"):
-                return pd.read_csv(source.file, skiprows=skiprows)
+                return pd.read_csv(source.file, skiprows=skiprows, usecols=usecols)
 
             if name.endswith(".xlsx") or name.endswith(".xls"):
-                with warnings.catch_warnings():
-                    warnings.filterwarnings(
-                        "ignore",
-                        category=UserWarning,
-                        module="openpyxl",
-                    )
-                    import io
-                    content = source.file.read()
-                    return pd.read_excel(
+                import io
+                content = source.file.read()
+                return _read_excel(
                     io.BytesIO(content),
                     sheet_name=sheet_name,
                     skiprows=skiprows,
-                     engine="openpyxl",
-                     )
+                    usecols=usecols,
+                )
 
         if isinstance(source, str) and os.path.exists(source):
-            with warnings.catch_warnings():
-                warnings.filterwarnings(
-                    "ignore",
-                    category=UserWarning,
-                    module="openpyxl",
-                )
-                return pd.read_excel(source, sheet_name=sheet_name, engine="openpyxl")
+            return _read_excel(source, sheet_name=sheet_name, usecols=usecols)
 
     except Exception as e:
         print("LOAD_FILE_ERROR:", e)
 
     return empty_df()
 
+def planning_version():
+    """(name, mtime) of every planning workbook, for cache keys."""
+    if not os.path.isdir(PLANNING_FOLDER):
+        return ()
+    return tuple(sorted(
+        (e.name, e.stat().st_mtime) for e in os.scandir(PLANNING_FOLDER)
+    ))
+
 # =========================
 # PLANNING DATA
 # =========================
+# Planning workbooks are re-read by several helpers per request; cache the
+# parsed sheet per (path, mtime) so a re-uploaded file is picked up.
+# Callers get a copy since some of them add columns.
 def load_planning_main(ref_date):
     path = get_planning_file_for_date(ref_date)
     if not os.path.exists(path):
         print("PLANNING FILE MISSING:", path)
         return empty_df()
 
+    return _load_planning_main_cached(path, os.path.getmtime(path)).copy()
+
+@lru_cache(maxsize=8)
+def _load_planning_main_cached(path, mtime):
     df = load_file(path, sheet_name="Main")
     if df.empty:
         return empty_df()
@@ -114,7 +158,8 @@ def load_planning_main(ref_date):
     if "asin" not in df.columns:
         return empty_df()
 
-    df["asin"] = df["asin"].astype(str).str.upper().str.strip()
+    # Categorical so ASIN merges/lookups hash int codes, not strings
+    df["asin"] = df["asin"].astype(str).str.upper().str.strip().astype("category")
     return df
 
 def load_planning_category(ref_date):
@@ -122,6 +167,10 @@ def load_planning_category(ref_date):
     if not os.path.exists(path):
         return empty_df()
 
+    return _load_planning_category_cached(path, os.path.getmtime(path)).copy()
+
+@lru_cache(maxsize=8)
+def _load_planning_category_cached(path, mtime):
     df = load_file(path, sheet_name="Category")
     if df.empty:
         return empty_df()
@@ -133,7 +182,11 @@ def load_planning_category(ref_date):
 # CORE INGESTION
 # =========================
 def build_rows(file, account, sales_date, is_vendor):
-    df = load_file(file, skiprows=1 if is_vendor else 0)
+    df = load_file(
+        file,
+        skiprows=1 if is_vendor else 0,
+        usecols=lambda c: norm(c) in _NEEDED_COLS,
+    )
     if df.empty:
         return empty_df()
 
@@ -152,8 +205,10 @@ def build_rows(file, account, sales_date, is_vendor):
     if plan_main.empty:
         return empty_df()
 
-    allowed_asins = set(plan_main["asin"])
-    df = df[df["ASIN"].isin(allowed_asins)]
+    # Casting to the planning categories is the semijoin: ASINs not in the
+    # plan become NaN codes and are dropped
+    df["ASIN"] = df["ASIN"].astype(plan_main["asin"].dtype)
+    df = df[df["ASIN"].notna()]
     if df.empty:
         return empty_df()
 
@@ -168,7 +223,7 @@ def build_rows(file, account, sales_date, is_vendor):
         # ALL ACCOUNTS → ONLY B2C (ignore B2B for planning consistency)
         # Audio Array → ONLY B2C
         # Cambium Retail / Viomi → B2C + B2B
-        df["sales"] = df["orderedproductsales"].apply(clean_money)
+        df["sales"] = clean_money_series(df["orderedproductsales"])
 
         # B2B sales are intentionally ignored for all Seller Central accounts
 
@@ -181,7 +236,7 @@ def build_rows(file, account, sales_date, is_vendor):
         if "orderedrevenue" not in df.columns:
             return empty_df()
 
-        df["sales"] = df["orderedrevenue"].apply(clean_money)
+        df["sales"] = clean_money_series(df["orderedrevenue"])
         df["net_sales"] = df["sales"]
 
     df["date"] = pd.to_datetime(sales_date)
@@ -192,8 +247,9 @@ def build_rows(file, account, sales_date, is_vendor):
 # =========================
 # KPI
 # =========================
-def calculate_kpis(df, ref_date):
-    if df.empty:
+def calculate_kpis(daily, ref_date):
+    """KPIs from the per-day net sales frame built by daily_net_sales()."""
+    if daily.empty:
         return {
             "monthly_target": 0,
             "target_till": 0,
@@ -212,7 +268,7 @@ def calculate_kpis(df, ref_date):
             "pace": 0,
         }
 
-    days = df["date"].nunique()
+    days = len(daily)
 
     # month-wise dynamic column already normalized
     month = pd.to_datetime(ref_date).strftime("%b").lower()
@@ -231,7 +287,7 @@ def calculate_kpis(df, ref_date):
     per_day_target = plan["perdaygoalprojected"].sum()
 
     target_till = per_day_target * days
-    actual = df["net_sales"].sum()
+    actual = daily["net_sales"].sum()
 
     return {
         "monthly_target": round(monthly_target, 1),
@@ -241,9 +297,9 @@ def calculate_kpis(df, ref_date):
         "pace": actual / target_till if target_till else 0,
     }
 
-    days = df["date"].nunique()
+    days = len(daily)
     target_till = PER_DAY_TARGET * days
-    actual = df["net_sales"].sum()
+    actual = daily["net_sales"].sum()
 
     return {
         "monthly_target": MONTHLY_TARGET,
@@ -256,8 +312,12 @@ def calculate_kpis(df, ref_date):
 # =========================
 # DAY / MTD / WEEK
 # =========================
-def day_wise_performance(df, ref_date):
-    if df.empty:
+def daily_net_sales(df):
+    # Shared by the KPI/day/MTD/week helpers so the ledger is grouped once
+    return df.groupby("date", as_index=False)["net_sales"].sum()
+
+def day_wise_performance(daily, ref_date):
+    if daily.empty:
         return []
 
     plan = load_planning_main(ref_date)
@@ -266,14 +326,14 @@ def day_wise_performance(df, ref_date):
 
     per_day_target = plan["perdaygoalprojected"].sum()
 
-    d = df.groupby("date", as_index=False)["net_sales"].sum()
+    d = daily.copy()
     d["actual"] = d["net_sales"]
     d["target"] = per_day_target
     d["achieved"] = (d["net_sales"] / per_day_target).round(2)
     return d.to_dict("records")
 
-def mtd_chart(df, ref_date):
-    if df.empty:
+def mtd_chart(daily, ref_date):
+    if daily.empty:
         return {"labels": [], "actual": [], "target": []}
 
     plan = load_planning_main(ref_date)
@@ -282,7 +342,7 @@ def mtd_chart(df, ref_date):
 
     per_day_target = plan["perdaygoalprojected"].sum()
 
-    d = df.groupby("date", as_index=False)["net_sales"].sum()
+    d = daily.copy()
     d["actual"] = d["net_sales"]
     d["cum_actual"] = d["net_sales"].cumsum()
     d["cum_target"] = per_day_target * (d.index + 1)
@@ -293,7 +353,7 @@ def mtd_chart(df, ref_date):
         "target": d["cum_target"].round(1).tolist(),
     }
 
-    d = df.groupby("date", as_index=False)["net_sales"].sum()
+    d = daily.copy()
     d["actual"] = d["net_sales"]
     d["cum_actual"] = d["net_sales"].cumsum()
     d["cum_target"] = PER_DAY_TARGET * (d.index + 1)
@@ -312,8 +372,11 @@ def week_wise(df):
         df.assign(week=df["date"].dt.to_period("W").astype(str))
         .groupby("week", as_index=False)["net_sales"]
         .sum()
-        .round(1)
-        .to_html(index=False, classes="table table-striped table-bordered table-sm")
+        .to_html(
+            index=False,
+            float_format="{:.1f}".format,
+            classes="table table-striped table-bordered table-sm",
+        )
     )
 
 # =========================
@@ -326,7 +389,7 @@ def filter_by_date_range(df, f, t):
 # ASIN TARGET VS ACTUAL
 # =========================
 def asin_target_vs_actual(ledger, f, t):
-    ledger_filtered = filter_by_date_range(ledger, f, t).copy()
+    ledger_filtered = filter_by_date_range(ledger, f, t)
     if ledger_filtered.empty:
         return []
 
@@ -354,7 +417,7 @@ def asin_target_vs_actual(ledger, f, t):
     model_col = next((c for c in ["model#", "model", "modelno", "modelnumber", "sku"] if c in plan.columns), None)
 
     rows = []
-    for _, r in merged.iterrows():
+    for r in merged.to_dict("records"):
         target = round(float(r["period_target"]), 1)
         actual_val = round(float(r["net_sales"]), 1)
         ach = round((actual_val / target * 100), 1) if target else 0.0
@@ -381,7 +444,6 @@ def asin_target_vs_actual(ledger, f, t):
 # =========================
 def category_target_vs_actual(ledger, f, t):
     ledger = filter_by_date_range(ledger, f, t)
-    ledger = ledger.copy()
     if ledger.empty:
         return []
 
@@ -390,8 +452,13 @@ def category_target_vs_actual(ledger, f, t):
     if plan_main.empty or plan_cat.empty:
         return []
 
-    asin_category = plan_main.set_index("asin")["category"].to_dict()
-    ledger["category"] = ledger["ASIN"].map(asin_category)
+    # Hash join instead of a per-row dict lookup; last plan row wins as before
+    asin_category = (
+        plan_main[["asin", "category"]]
+        .drop_duplicates("asin", keep="last")
+        .rename(columns={"asin": "ASIN"})
+    )
+    ledger = ledger.merge(asin_category, on="ASIN", how="left")
 
     actual = ledger.groupby("category", as_index=False)["net_sales"].sum()
 
@@ -401,7 +468,7 @@ def category_target_vs_actual(ledger, f, t):
     merged = plan_cat.merge(actual, on="category", how="left").fillna(0)
 
     rows = []
-    for _, r in merged.iterrows():
+    for r in merged.to_dict("records"):
         target = round(float(r["period_target"]), 1)
         actual_val = round(float(r["net_sales"]), 1)
         per_day = round(float(r["perdaygoal"]), 1)
@@ -443,11 +510,12 @@ def category_target_vs_actual(ledger, f, t):
 # =========================
 # DATA INTEGRITY & VALIDATION (READ-ONLY)
 # =========================
-def validation_summary(ledger, f, t):
+def validation_summary(ledger, f, t, daily=None):
     """
     Read-only validation helper.
     Does NOT mutate data.
     Used only for dashboard reconciliation & audit visibility.
+    Pass `daily` (daily_net_sales of the same selection) to skip a regroup.
     """
     try:
         # Defensive copy
@@ -478,11 +546,9 @@ def validation_summary(ledger, f, t):
         # ---------- RECONCILIATION ----------
         kpi_actual = round(df["net_sales"].sum(), 1)
 
-        day_sum = (
-            df.groupby("date", as_index=False)["net_sales"]
-            .sum()["net_sales"]
-            .sum()
-        )
+        if daily is None:
+            daily = daily_net_sales(df)
+        day_sum = daily["net_sales"].sum()
         day_sum = round(day_sum, 1)
 
         difference = round(kpi_actual - day_sum, 1)
@@ -530,7 +596,7 @@ def monthwise_asin_table(ledger):
     pivot = pivot.sort_values("Total", ascending=False).reset_index()
     month_cols = [c for c in pivot.columns if c not in ("ASIN", "Total")]
     rows_html = ""
-    for _, row in pivot.iterrows():
+    for row in pivot.to_dict("records"):
         total = row["Total"]
         cells = ""
         for m in month_cols:
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from fastapi import FastAPI, Request, Form, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
@@ -15,15 +16,16 @@ from sqlalchemy.engine import Engine
 
 from app.services.services import (
     build_rows,
+    daily_net_sales,
     calculate_kpis,
     day_wise_performance,
     mtd_chart,
     week_wise,
-    filter_by_date_range,
     asin_target_vs_actual,
     category_target_vs_actual,
     validation_summary,
     monthwise_asin_chart_data,
+    planning_version,
 )
 
 # ==================================================
@@ -58,6 +60,22 @@ def init_db():
             UNIQUE(date, account, asin)
         );
         """))
+        # UNIQUE(date, account, asin) already serves date range scans via its prefix
+        conn.execute(text("DROP INDEX IF EXISTS idx_ledger_date"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_ledger_account ON ledger (account)"))
+
+        # Single-row write counter; every ledger write bumps it in its own transaction
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS ledger_meta (
+            id INTEGER PRIMARY KEY,
+            version BIGINT NOT NULL
+        );
+        """))
+        conn.execute(text("""
+        INSERT INTO ledger_meta (id, version)
+        VALUES (1, 0)
+        ON CONFLICT (id) DO NOTHING
+        """))
 
 init_db()
 
@@ -65,16 +83,71 @@ init_db()
 # LEDGER IO
 # ==================================================
 LEDGER_COLUMNS = ["date", "account", "ASIN", "sales", "net_sales"]
+SAVE_BATCH_SIZE = 500
+DOWNLOAD_CHUNK_ROWS = 50000
+
+def ledger_version() -> int:
+    # Primary-key lookup on ledger_meta; changes on every committed ledger write
+    with engine.begin() as conn:
+        return conn.execute(text("SELECT version FROM ledger_meta WHERE id = 1")).scalar_one()
+
+def bump_ledger_version(conn):
+    # Call inside the writing transaction so readers never see new rows with an old version
+    conn.execute(text("UPDATE ledger_meta SET version = version + 1 WHERE id = 1"))
+
+def load_ledger(f=None, t=None, version=None) -> pd.DataFrame:
+    # Date filter runs in SQL so only the selected range leaves the DB
+    if f is not None and t is not None:
+        if pd.isna(f) or pd.isna(t):
+            return pd.DataFrame(columns=LEDGER_COLUMNS)
+        f, t = pd.Timestamp(f).date(), pd.Timestamp(t).date()
+    else:
+        f = t = None
+
+    if version is None:
+        version = ledger_version()
+    return _load_ledger_cached(f, t, version).copy()
+
+@lru_cache(maxsize=8)
+def _load_ledger_cached(f, t, version) -> pd.DataFrame:
+    sql = "SELECT date, account, asin AS \"ASIN\", sales, net_sales FROM ledger"
+    params = {}
+    if f is not None:
+        sql += " WHERE date BETWEEN :f AND :t"
+        params = {"f": f, "t": t}
 
-def load_ledger() -> pd.DataFrame:
     with engine.begin() as conn:
         df = pd.read_sql(
-            text("SELECT date, account, asin AS \"ASIN\", sales, net_sales FROM ledger"),
+            text(sql),
             conn,
+            params=params,
             parse_dates=["date"]
         )
     return df[LEDGER_COLUMNS] if not df.empty else pd.DataFrame(columns=LEDGER_COLUMNS)
 
+def _month_start_sql(col: str) -> str:
+    if engine.dialect.name == "postgresql":
+        return f"CAST(date_trunc('month', {col}) AS DATE)"
+    return f"date({col}, 'start of month')"
+
+def load_ledger_monthly() -> pd.DataFrame:
+    """Per-ASIN net sales summed by month (date = first of month)."""
+    month = _month_start_sql("date")
+    with engine.begin() as conn:
+        df = pd.read_sql(
+            text(f"""
+            SELECT {month} AS date, asin AS "ASIN", SUM(net_sales) AS net_sales
+            FROM ledger
+            GROUP BY {month}, asin
+            """),
+            conn,
+            parse_dates=["date"]
+        )
+    if df.empty:
+        return pd.DataFrame(columns=["date", "ASIN", "net_sales"])
+    df["net_sales"] = df["net_sales"].astype(float)
+    return df
+
 def save_ledger(rows: pd.DataFrame):
     if rows.empty:
         return
@@ -86,7 +159,25 @@ def save_ledger(rows: pd.DataFrame):
     rows["date"] = pd.to_datetime(rows["date"]).dt.date
 
     with engine.begin() as conn:
-        for _, r in rows.iterrows():
+        bump_ledger_version(conn)
+
+        if engine.dialect.name == "postgresql":
+            _copy_upsert(conn, rows)
+            return
+
+        # One executemany per batch instead of one round-trip per row
+        # Columnar zip avoids building a Series/dict per row
+        records = [
+            {"date": d, "account": a, "asin": s, "sales": x, "net_sales": n}
+            for d, a, s, x, n in zip(
+                rows["date"].tolist(),
+                rows["account"].tolist(),
+                rows["asin"].tolist(),
+                rows["sales"].tolist(),
+                rows["net_sales"].tolist(),
+            )
+        ]
+        for i in range(0, len(records), SAVE_BATCH_SIZE):
             conn.execute(
                 text("""
                 INSERT INTO ledger (date, account, asin, sales, net_sales)
@@ -96,9 +187,47 @@ def save_ledger(rows: pd.DataFrame):
                     sales = EXCLUDED.sales,
                     net_sales = EXCLUDED.net_sales
                 """),
-                r.to_dict()
+                records[i:i + SAVE_BATCH_SIZE]
             )
 
+def _copy_upsert(conn, rows: pd.DataFrame):
+    # Postgres bulk path: COPY into a temp stage, then one INSERT ... SELECT
+    conn.execute(text("""
+    CREATE TEMP TABLE ledger_stage (
+        seq BIGSERIAL,
+        date DATE NOT NULL,
+        account TEXT NOT NULL,
+        asin TEXT NOT NULL,
+        sales NUMERIC NOT NULL,
+        net_sales NUMERIC NOT NULL
+    ) ON COMMIT DROP
+    """))
+
+    buf = io.StringIO()
+    rows.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+
+    cur = conn.connection.cursor()
+    try:
+        cur.copy_expert(
+            "COPY ledger_stage (date, account, asin, sales, net_sales) FROM STDIN WITH CSV",
+            buf,
+        )
+    finally:
+        cur.close()
+
+    # Same ASIN can repeat within one upload: keep the last row, like the row-wise upsert did
+    conn.execute(text("""
+    INSERT INTO ledger (date, account, asin, sales, net_sales)
+    SELECT DISTINCT ON (date, account, asin) date, account, asin, sales, net_sales
+    FROM ledger_stage
+    ORDER BY date, account, asin, seq DESC
+    ON CONFLICT (date, account, asin)
+    DO UPDATE SET
+        sales = EXCLUDED.sales,
+        net_sales = EXCLUDED.net_sales
+    """))
+
 # ==================================================
 # MONTH HELPERS
 # ==================================================
@@ -107,16 +236,11 @@ def get_month_bounds(month_str: str):
     end = (start + pd.offsets.MonthEnd(1)).to_pydatetime()
     return start, end
 
-def available_months_from_ledger(ledger: pd.DataFrame):
-    if ledger.empty:
-        return []
-    return sorted(
-        ledger["date"]
-        .dt.to_period("M")
-        .astype(str)
-        .apply(lambda x: datetime.strptime(x, "%Y-%m").strftime("%b %Y"))
-        .unique()
-    )
+def available_months_from_ledger():
+    month = _month_start_sql("date")
+    with engine.begin() as conn:
+        months = conn.execute(text(f"SELECT DISTINCT {month} FROM ledger")).scalars().all()
+    return sorted({pd.Timestamp(m).strftime("%b %Y") for m in months if m is not None})
 
 # ==================================================
 # DASHBOARD RENDER
@@ -131,27 +255,43 @@ def render_dashboard(
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
 ):
-    ledger = load_ledger()
-    months = available_months_from_ledger(ledger)
+    # Versions are cheap probes; the ledger counter is bumped in every write
+    # transaction (shared across workers via the DB) and planning files are
+    # keyed on mtime, so repeat views skip all pandas work
+    context = dict(_dashboard_context(
+        selected_month,
+        from_date,
+        to_date,
+        ledger_version(),
+        planning_version(),
+    ))
+    context["error"] = error
+    return templates.TemplateResponse(request=request, name="index.html", context=context)
+
+@lru_cache(maxsize=32)
+def _dashboard_context(selected_month, from_date, to_date, ledger_ver, planning_ver) -> dict:
+    months = available_months_from_ledger()
 
     f = t = None
-    ledger_filtered = ledger
+    filtered = False
 
     # ---- DATE RANGE (TOP PRIORITY) ----
     if from_date and to_date and from_date != "" and to_date != "":
         f = pd.to_datetime(from_date, format="%Y-%m-%d", errors="coerce")
         t = pd.to_datetime(to_date, format="%Y-%m-%d", errors="coerce")
-        if (pd.notna(f) and pd.notna(t)) or selected_month:
-            ledger_filtered = filter_by_date_range(ledger, f, t)
+        filtered = (pd.notna(f) and pd.notna(t)) or bool(selected_month)
 
     # ---- MONTH FALLBACK ----
     elif selected_month:
         f, t = get_month_bounds(selected_month)
-        ledger_filtered = filter_by_date_range(ledger, f, t)
+        filtered = True
+
+    # Range filter is applied in SQL; everything below works on the selection
+    ledger = load_ledger(f, t, ledger_ver) if filtered else load_ledger(version=ledger_ver)
+    ledger_filtered = ledger
 
     context = {
     "upload_enabled": bool(ADMIN_UPLOAD_KEY),
-    "error": error,
     "months": months,
     "selected_month": selected_month or "",
     "from_date": from_date or "",
@@ -175,7 +315,7 @@ def render_dashboard(
             "monthwise_chart": {"labels": [], "asins": [], "data": []},
             "validation": validation_summary(ledger, f, t),
         })
-        return templates.TemplateResponse(request=request, name="index.html", context=context)
+        return context
 
     # ---------------- REF DATE ----------------
     if t is not None:
@@ -189,15 +329,16 @@ def render_dashboard(
         ref_date = pd.Timestamp.today()
 
     # ---------------- KPIs ----------------
+    daily = daily_net_sales(ledger_filtered)
     context.update({
-        **calculate_kpis(ledger_filtered, ref_date),
-        "daywise": day_wise_performance(ledger_filtered, ref_date),
-        "chart": mtd_chart(ledger_filtered, ref_date),
-        "weekwise": week_wise(ledger_filtered),
+        **calculate_kpis(daily, ref_date),
+        "daywise": day_wise_performance(daily, ref_date),
+        "chart": mtd_chart(daily, ref_date),
+        "weekwise": week_wise(daily),
     })
 
     # ---------------- DATA VALIDATION (READ-ONLY) ----------------
-    context["validation"] = validation_summary(ledger, f, t)
+    context["validation"] = validation_summary(ledger, f, t, daily)
 
 
     # ---------------- OPTION 2: AUTO-CLAMP TARGETS ----------------
@@ -210,7 +351,7 @@ def render_dashboard(
         context["asin_rows"] = asin_rows
         context["total_units_ordered"] = sum(r["units_ordered"] for r in asin_rows)
         context["cat_rows"] = category_target_vs_actual(ledger, tf, tt)
-        context["monthwise_chart"] = monthwise_asin_chart_data(ledger)
+        context["monthwise_chart"] = monthwise_asin_chart_data(load_ledger_monthly())
     else:
         context["asin_rows"] = []
         context["total_units_ordered"] = 0
@@ -224,7 +365,7 @@ def render_dashboard(
     context.setdefault("achievement_pct", 0)
     context.setdefault("pace_index", 0)
 
-    return templates.TemplateResponse(request=request, name="index.html", context=context)
+    return context
 # ==================================================
 # ROUTES
 # ==================================================
@@ -308,6 +449,7 @@ async def log_sales(
     # ---------------- REPLACE DAY MODE ----------------
     if replace_day in ("1", "true", "True", "on"):
         with engine.begin() as conn:
+            bump_ledger_version(conn)
             for _, acct, _ in uploads:
                 conn.execute(
                     text("DELETE FROM ledger WHERE date = :d AND account = :a"),
@@ -328,10 +470,8 @@ def download_ledger(
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
 ):
-    ledger = load_ledger()
-
-    if ledger.empty:
-        return {"error": "No ledger data"}
+    f = t = None
+    filtered = False
 
     # Apply SAME filter logic as dashboard (DEFENSIVE, NO LOGIC CHANGE)
     if (
@@ -342,23 +482,31 @@ def download_ledger(
     ):
         f = pd.to_datetime(from_date, format="%Y-%m-%d", errors="coerce")
         t = pd.to_datetime(to_date, format="%Y-%m-%d", errors="coerce")
-
-        if (pd.notna(f) and pd.notna(t)) or month:
-            ledger = filter_by_date_range(ledger, f, t)
+        filtered = (pd.notna(f) and pd.notna(t)) or bool(month)
 
     elif month:
         f, t = get_month_bounds(month)
-        ledger = filter_by_date_range(ledger, f, t)
+        filtered = True
+
+    ledger = load_ledger(f, t) if filtered else load_ledger()
 
     if ledger.empty:
+        if not filtered:
+            return {"error": "No ledger data"}
         return {"error": "No data for selected filters"}
 
-    buffer = io.StringIO()
-    ledger.sort_values(["date", "account", "ASIN"]).to_csv(buffer, index=False)
-    buffer.seek(0)
+    ledger = ledger.sort_values(["date", "account", "ASIN"])
+
+    # Stream in slices so the whole CSV text is never held in memory at once
+    def csv_chunks():
+        yield ",".join(ledger.columns) + "\n"
+        for i in range(0, len(ledger), DOWNLOAD_CHUNK_ROWS):
+            buf = io.StringIO()
+            ledger.iloc[i:i + DOWNLOAD_CHUNK_ROWS].to_csv(buf, index=False, header=False)
+            yield buf.getvalue()
 
     return StreamingResponse(
-        buffer,
+        csv_chunks(),
         media_type="text/csv",
         headers={
             "Content-Disposition": "attachment; filename=sales_ledger.csv"